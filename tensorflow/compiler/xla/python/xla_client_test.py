@@ -18,14 +18,52 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import collections
+import functools
 import itertools
+import re
 
 import numpy as np
+import six
 
 from tensorflow.compiler.xla.python import xla_client
 import unittest
 
 
+def _ArrayShape(value):
+  """Returns the shape of an ndarray or of any other array-like value."""
+  if isinstance(value, np.ndarray):
+    return value.shape
+  return np.asanyarray(value).shape
+
+
+def _AssertEqual(actual, desired):
+  """np.testing.assert_equal, skipped when a plain equality check passes."""
+  if not np.array_equal(actual, desired):
+    np.testing.assert_equal(actual, desired)
+
+
+def _AssertEqualFP(actual, desired):
+  """Bit-exact check of a floating point result against integral values."""
+  actual = np.asarray(actual)
+  _AssertEqual(actual, np.asarray(desired, dtype=actual.dtype))
+
+
+def _AssertAllClose(actual, desired, rtol=1e-7):
+  """np.testing.assert_allclose, skipped when a plain tolerance check passes.
+
+  On these tiny arrays np.testing's bookkeeping dominates the comparison, and
+  is only needed to report a failure.
+  """
+  actual, desired = np.asarray(actual), np.asarray(desired)
+  if actual.dtype.kind in "fc":
+    close = np.all(np.abs(actual - desired) <= rtol * np.abs(desired))
+  else:
+    close = np.array_equal(actual, desired)
+  if not close:
+    np.testing.assert_allclose(actual, desired, rtol=rtol)
+
+
 class LocalComputationTest(unittest.TestCase):
   """Base class for running an XLA Computation through the local client."""
 
@@ -34,290 +72,268 @@ class LocalComputationTest(unittest.TestCase):
       name = self.id()
     return xla_client.ComputationBuilder(name)
 
+  def _Compile(self, c, arguments):
+    # Accepts a builder, or a computation that has already been compiled.
+    if isinstance(c, xla_client.LocalComputation) and c.is_compiled:
+      return c
+    return c.Build().CompileWithExampleArguments(arguments)
+
   def _Execute(self, c, arguments):
-    compiled_c = c.Build().CompileWithExampleArguments(arguments)
+    compiled_c = self._Compile(c, arguments)
     return compiled_c.Execute(arguments)
 
   def _ExecuteAndAssertWith(self, assert_func, c, arguments, expected):
     assert expected is not None
     result = self._Execute(c, arguments)
+    self._AssertResult(assert_func, result, expected)
+
+  def _AssertResult(self, assert_func, result, expected):
     # Numpy's comparison methods are a bit too lenient by treating inputs as
     # "array-like", meaning that scalar 4 will be happily compared equal to
     # [[4]]. We'd like to be more strict so assert shapes as well.
-    self.assertEqual(np.asanyarray(result).shape, np.asanyarray(expected).shape)
-    assert_func(result, expected)
+    try:
+      self.assertEqual(_ArrayShape(result), _ArrayShape(expected))
+      assert_func(result, expected)
+    except AssertionError as e:
+      # Name the result's dtype, which tells which variant of a test that loops
+      # over element types failed.
+      e.args = ("%s\nresult dtype: %s" % (e, result.dtype),)
+      raise
 
   def _ExecuteAndCompareExact(self, c, arguments=(), expected=None):
-    self._ExecuteAndAssertWith(np.testing.assert_equal, c, arguments, expected)
+    self._ExecuteAndAssertWith(_AssertEqual, c, arguments, expected)
 
   def _ExecuteAndCompareClose(self, c, arguments=(), expected=None):
-    self._ExecuteAndAssertWith(np.testing.assert_allclose, c, arguments,
-                               expected)
+    self._ExecuteAndAssertWith(_AssertAllClose, c, arguments, expected)
+
+  def _ExecuteAndCompareExactFP(self, c, arguments=(), expected=None):
+    self._ExecuteAndAssertWith(_AssertEqualFP, c, arguments, expected)
+
+  def _BatchExecuteAndAssertWith(self, assert_func, c, arguments, cases):
+    # Runs the (op, expected) cases as a single computation, whose result is
+    # the tuple of all ops, rather than compiling and running each separately.
+    assert cases
+    ops, expecteds = zip(*cases)
+    c.Tuple(*ops)
+    results = self._Execute(c, arguments)
+    self.assertEqual(len(results), len(expecteds))
+    for result, expected in zip(results, expecteds):
+      self._AssertResult(assert_func, result, expected)
+
+  def _BatchExecuteAndCompareExact(self, c, arguments=(), cases=None):
+    self._BatchExecuteAndAssertWith(_AssertEqual, c, arguments, cases)
+
+  def _BatchExecuteAndCompareClose(self, c, arguments=(), cases=None):
+    self._BatchExecuteAndAssertWith(_AssertAllClose, c, arguments, cases)
+
+  def _BatchExecuteAndCompareExactFP(self, c, arguments=(), cases=None):
+    self._BatchExecuteAndAssertWith(_AssertEqualFP, c, arguments, cases)
 
 
 def NumpyArrayF32(*args, **kwargs):
   """Convenience wrapper to create Numpy arrays with a np.float32 dtype."""
-  return np.array(*args, dtype=np.float32, **kwargs)
+  return np.asarray(*args, dtype=np.float32, **kwargs)
 
 
 def NumpyArrayF64(*args, **kwargs):
   """Convenience wrapper to create Numpy arrays with a np.float64 dtype."""
-  return np.array(*args, dtype=np.float64, **kwargs)
+  return np.asarray(*args, dtype=np.float64, **kwargs)
 
 
 def NumpyArrayS32(*args, **kwargs):
   """Convenience wrapper to create Numpy arrays with a np.int32 dtype."""
-  return np.array(*args, dtype=np.int32, **kwargs)
+  return np.asarray(*args, dtype=np.int32, **kwargs)
 
 
 def NumpyArrayS64(*args, **kwargs):
   """Convenience wrapper to create Numpy arrays with a np.int64 dtype."""
-  return np.array(*args, dtype=np.int64, **kwargs)
+  return np.asarray(*args, dtype=np.int64, **kwargs)
 
 
 def NumpyArrayBool(*args, **kwargs):
   """Convenience wrapper to create Numpy arrays with a np.bool dtype."""
-  return np.array(*args, dtype=np.bool, **kwargs)
-
-
-class ComputationsWithConstantsTest(LocalComputationTest):
-  """Tests focusing on Constant ops."""
-
-  def testConstantScalarSumF32(self):
-    c = self._NewComputation()
-    c.Add(c.ConstantF32Scalar(1.11), c.ConstantF32Scalar(3.14))
-    self._ExecuteAndCompareClose(c, expected=4.25)
-
-  def testConstantScalarSumF64(self):
-    c = self._NewComputation()
-    c.Add(c.ConstantF64Scalar(1.11), c.ConstantF64Scalar(3.14))
-    self._ExecuteAndCompareClose(c, expected=4.25)
+  return np.asarray(*args, dtype=np.bool, **kwargs)
 
-  def testConstantScalarSumS32(self):
-    c = self._NewComputation()
-    c.Add(c.ConstantS32Scalar(1), c.ConstantS32Scalar(2))
-    self._ExecuteAndCompareClose(c, expected=3)
 
-  def testConstantScalarSumS64(self):
-    c = self._NewComputation()
-    c.Add(c.ConstantS64Scalar(1), c.ConstantS64Scalar(2))
-    self._ExecuteAndCompareClose(c, expected=3)
+def _ReadOnly(array):
+  """Marks a module-level constant array as read-only and returns it."""
+  array.setflags(write=False)
+  return array
 
-  def testConstantVectorMulF32(self):
-    c = self._NewComputation()
-    c.Mul(
-        c.Constant(NumpyArrayF32([2.5, 3.3, -1.2, 0.7])),
-        c.Constant(NumpyArrayF32([-1.2, 2, -2, -3])))
-    self._ExecuteAndCompareClose(c, expected=[-3, 6.6, 2.4, -2.1])
 
-  def testConstantVectorMulF64(self):
-    c = self._NewComputation()
-    c.Mul(
-        c.Constant(NumpyArrayF64([2.5, 3.3, -1.2, 0.7])),
-        c.Constant(NumpyArrayF64([-1.2, 2, -2, -3])))
-    self._ExecuteAndCompareClose(c, expected=[-3, 6.6, 2.4, -2.1])
+# Scalars that only serve to convey a parameter's shape to ParameterFromNumpy.
+_F32_SCALAR_SENTINEL = _ReadOnly(NumpyArrayF32(0))
+_F64_SCALAR_SENTINEL = _ReadOnly(NumpyArrayF64(0))
+_SCALAR_SENTINELS = {
+    np.float32: _F32_SCALAR_SENTINEL,
+    np.float64: _F64_SCALAR_SENTINEL,
+}
 
-  def testConstantVectorScalarDivF32(self):
-    c = self._NewComputation()
-    c.Div(
-        c.Constant(NumpyArrayF32([1.5, 2.5, 3.0, -10.8])),
-        c.ConstantF32Scalar(2.0))
-    self._ExecuteAndCompareClose(c, expected=[0.75, 1.25, 1.5, -5.4])
+# (array constructor, scalar constant builder method) pairs for the element
+# types that dtype-generic tests loop over.
+_FLOAT_TYPES = (
+    (NumpyArrayF32, xla_client.ComputationBuilder.ConstantF32Scalar),
+    (NumpyArrayF64, xla_client.ComputationBuilder.ConstantF64Scalar),
+)
 
-  def testConstantVectorScalarDivF64(self):
-    c = self._NewComputation()
-    c.Div(
-        c.Constant(NumpyArrayF64([1.5, 2.5, 3.0, -10.8])),
-        c.ConstantF64Scalar(2.0))
-    self._ExecuteAndCompareClose(c, expected=[0.75, 1.25, 1.5, -5.4])
+_INT_TYPES = (
+    (NumpyArrayS32, xla_client.ComputationBuilder.ConstantS32Scalar),
+    (NumpyArrayS64, xla_client.ComputationBuilder.ConstantS64Scalar),
+)
 
-  def testConstantVectorScalarPowF32(self):
-    c = self._NewComputation()
-    c.Pow(c.Constant(NumpyArrayF32([1.5, 2.5, 3.0])), c.ConstantF32Scalar(2.))
-    self._ExecuteAndCompareClose(c, expected=[2.25, 6.25, 9.])
+class ComputationsWithConstantsTest(LocalComputationTest):
+  """Tests focusing on Constant ops."""
 
-  def testConstantVectorScalarPowF64(self):
-    c = self._NewComputation()
-    c.Pow(c.Constant(NumpyArrayF64([1.5, 2.5, 3.0])), c.ConstantF64Scalar(2.))
-    self._ExecuteAndCompareClose(c, expected=[2.25, 6.25, 9.])
+  def testConstantScalarSumFloat(self):
+    for _, constant_scalar in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Add(constant_scalar(c, 1.11), constant_scalar(c, 3.14))
+      self._ExecuteAndCompareClose(c, expected=4.25)
 
-  def testBooleanAnd(self):
-    c = self._NewComputation()
-    c.And(
-        c.Constant(NumpyArrayBool([True, False, True, False])),
-        c.Constant(NumpyArrayBool([True, True, False, False])))
-    self._ExecuteAndCompareExact(c, expected=[True, False, False, False])
+  def testConstantScalarSumInt(self):
+    for _, constant_scalar in _INT_TYPES:
+      c = self._NewComputation()
+      c.Add(constant_scalar(c, 1), constant_scalar(c, 2))
+      self._ExecuteAndCompareClose(c, expected=3)
 
-  def testBooleanOr(self):
-    c = self._NewComputation()
-    c.Or(
-        c.Constant(NumpyArrayBool([True, False, True, False])),
-        c.Constant(NumpyArrayBool([True, True, False, False])))
-    self._ExecuteAndCompareExact(c, expected=[True, True, True, False])
+  def testConstantVectorMul(self):
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Mul(
+          c.Constant(array_fun([2.5, 3.3, -1.2, 0.7])),
+          c.Constant(array_fun([-1.2, 2, -2, -3])))
+      self._ExecuteAndCompareClose(c, expected=[-3, 6.6, 2.4, -2.1])
 
-  def testSum2DF32(self):
-    c = self._NewComputation()
-    c.Add(
-        c.Constant(NumpyArrayF32([[1, 2, 3], [4, 5, 6]])),
-        c.Constant(NumpyArrayF32([[1, -1, 1], [-1, 1, -1]])))
-    self._ExecuteAndCompareClose(c, expected=[[2, 1, 4], [3, 6, 5]])
+  def testConstantVectorScalarDiv(self):
+    for array_fun, constant_scalar in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Div(
+          c.Constant(array_fun([1.5, 2.5, 3.0, -10.8])),
+          constant_scalar(c, 2.0))
+      self._ExecuteAndCompareClose(c, expected=[0.75, 1.25, 1.5, -5.4])
 
-  def testSum2DF64(self):
-    c = self._NewComputation()
-    c.Add(
-        c.Constant(NumpyArrayF64([[1, 2, 3], [4, 5, 6]])),
-        c.Constant(NumpyArrayF64([[1, -1, 1], [-1, 1, -1]])))
-    self._ExecuteAndCompareClose(c, expected=[[2, 1, 4], [3, 6, 5]])
+  def testConstantVectorScalarPow(self):
+    for array_fun, constant_scalar in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Pow(c.Constant(array_fun([1.5, 2.5, 3.0])), constant_scalar(c, 2.))
+      self._ExecuteAndCompareClose(c, expected=[2.25, 6.25, 9.])
 
-  def testSum2DWith1DBroadcastDim0F32(self):
-    # sum of a 2D array with a 1D array where the latter is replicated across
-    # dimension 0 to match the former's shape.
-    c = self._NewComputation()
-    c.Add(
-        c.Constant(NumpyArrayF32([[1, 2, 3], [4, 5, 6], [7, 8, 9]])),
-        c.Constant(NumpyArrayF32([10, 20, 30])),
-        broadcast_dimensions=(0,))
-    self._ExecuteAndCompareClose(
-        c, expected=[[11, 12, 13], [24, 25, 26], [37, 38, 39]])
+  def testSum2D(self):
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Add(
+          c.Constant(array_fun([[1, 2, 3], [4, 5, 6]])),
+          c.Constant(array_fun([[1, -1, 1], [-1, 1, -1]])))
+      self._ExecuteAndCompareClose(c, expected=[[2, 1, 4], [3, 6, 5]])
 
-  def testSum2DWith1DBroadcastDim0F64(self):
+  def testSum2DWith1DBroadcastDim0(self):
     # sum of a 2D array with a 1D array where the latter is replicated across
     # dimension 0 to match the former's shape.
-    c = self._NewComputation()
-    c.Add(
-        c.Constant(NumpyArrayF64([[1, 2, 3], [4, 5, 6], [7, 8, 9]])),
-        c.Constant(NumpyArrayF64([10, 20, 30])),
-        broadcast_dimensions=(0,))
-    self._ExecuteAndCompareClose(
-        c, expected=[[11, 12, 13], [24, 25, 26], [37, 38, 39]])
-
-  def testSum2DWith1DBroadcastDim1F32(self):
-    # sum of a 2D array with a 1D array where the latter is replicated across
-    # dimension 1 to match the former's shape.
-    c = self._NewComputation()
-    c.Add(
-        c.Constant(NumpyArrayF32([[1, 2, 3], [4, 5, 6], [7, 8, 9]])),
-        c.Constant(NumpyArrayF32([10, 20, 30])),
-        broadcast_dimensions=(1,))
-    self._ExecuteAndCompareClose(
-        c, expected=[[11, 22, 33], [14, 25, 36], [17, 28, 39]])
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Add(
+          c.Constant(array_fun([[1, 2, 3], [4, 5, 6], [7, 8, 9]])),
+          c.Constant(array_fun([10, 20, 30])),
+          broadcast_dimensions=(0,))
+      self._ExecuteAndCompareClose(
+          c, expected=[[11, 12, 13], [24, 25, 26], [37, 38, 39]])
 
-  def testSum2DWith1DBroadcastDim1F64(self):
+  def testSum2DWith1DBroadcastDim1(self):
     # sum of a 2D array with a 1D array where the latter is replicated across
     # dimension 1 to match the former's shape.
-    c = self._NewComputation()
-    c.Add(
-        c.Constant(NumpyArrayF64([[1, 2, 3], [4, 5, 6], [7, 8, 9]])),
-        c.Constant(NumpyArrayF64([10, 20, 30])),
-        broadcast_dimensions=(1,))
-    self._ExecuteAndCompareClose(
-        c, expected=[[11, 22, 33], [14, 25, 36], [17, 28, 39]])
-
-  def testConstantAxpyF32(self):
-    c = self._NewComputation()
-    c.Add(
-        c.Mul(
-            c.ConstantF32Scalar(2),
-            c.Constant(NumpyArrayF32([2.2, 3.3, 4.4, 5.5]))),
-        c.Constant(NumpyArrayF32([100, -100, 200, -200])))
-    self._ExecuteAndCompareClose(c, expected=[104.4, -93.4, 208.8, -189])
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Add(
+          c.Constant(array_fun([[1, 2, 3], [4, 5, 6], [7, 8, 9]])),
+          c.Constant(array_fun([10, 20, 30])),
+          broadcast_dimensions=(1,))
+      self._ExecuteAndCompareClose(
+          c, expected=[[11, 22, 33], [14, 25, 36], [17, 28, 39]])
 
-  def testConstantAxpyF64(self):
-    c = self._NewComputation()
-    c.Add(
-        c.Mul(
-            c.ConstantF64Scalar(2),
-            c.Constant(NumpyArrayF64([2.2, 3.3, 4.4, 5.5]))),
-        c.Constant(NumpyArrayF64([100, -100, 200, -200])))
-    self._ExecuteAndCompareClose(c, expected=[104.4, -93.4, 208.8, -189])
+  def testConstantAxpy(self):
+    # The scalar is broadcast explicitly, so that the Mul and Add are plain
+    # element-wise ops of the same shape that XLA can fuse into one loop.
+    for array_fun, constant_scalar in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Add(
+          c.Mul(
+              c.Broadcast(constant_scalar(c, 2), sizes=(4,)),
+              c.Constant(array_fun([2.2, 3.3, 4.4, 5.5]))),
+          c.Constant(array_fun([100, -100, 200, -200])))
+      self._ExecuteAndCompareClose(c, expected=[104.4, -93.4, 208.8, -189])
 
 
 class ParametersTest(LocalComputationTest):
   """Tests focusing on Parameter ops and argument-passing."""
 
-  def setUp(self):
-    self.f32_scalar_2 = NumpyArrayF32(2.0)
-    self.f32_4vector = NumpyArrayF32([-2.3, 3.3, -4.3, 5.3])
-    self.f64_scalar_2 = NumpyArrayF64(2.0)
-    self.f64_4vector = NumpyArrayF64([-2.3, 3.3, -4.3, 5.3])
-    self.s32_scalar_3 = NumpyArrayS32(3)
-    self.s32_4vector = NumpyArrayS32([10, 15, -2, 7])
-    self.s64_scalar_3 = NumpyArrayS64(3)
-    self.s64_4vector = NumpyArrayS64([10, 15, -2, 7])
-
-  def testScalarTimesVectorAutonumberF32(self):
-    c = self._NewComputation()
-    p0 = c.ParameterFromNumpy(self.f32_scalar_2)
-    p1 = c.ParameterFromNumpy(self.f32_4vector)
-    c.Mul(p0, p1)
-    self._ExecuteAndCompareClose(
-        c,
-        arguments=[self.f32_scalar_2, self.f32_4vector],
-        expected=[-4.6, 6.6, -8.6, 10.6])
-
-  def testScalarTimesVectorAutonumberF64(self):
-    c = self._NewComputation()
-    p0 = c.ParameterFromNumpy(self.f64_scalar_2)
-    p1 = c.ParameterFromNumpy(self.f64_4vector)
-    c.Mul(p0, p1)
-    self._ExecuteAndCompareClose(
-        c,
-        arguments=[self.f64_scalar_2, self.f64_4vector],
-        expected=[-4.6, 6.6, -8.6, 10.6])
-
-  def testScalarTimesVectorS32(self):
-    c = self._NewComputation()
-    p0 = c.ParameterFromNumpy(self.s32_scalar_3)
-    p1 = c.ParameterFromNumpy(self.s32_4vector)
-    c.Mul(p0, p1)
-    self._ExecuteAndCompareExact(
-        c,
-        arguments=[self.s32_scalar_3, self.s32_4vector],
-        expected=[30, 45, -6, 21])
-
-  def testScalarTimesVectorS64(self):
-    c = self._NewComputation()
-    p0 = c.ParameterFromNumpy(self.s64_scalar_3)
-    p1 = c.ParameterFromNumpy(self.s64_4vector)
-    c.Mul(p0, p1)
-    self._ExecuteAndCompareExact(
-        c,
-        arguments=[self.s64_scalar_3, self.s64_4vector],
-        expected=[30, 45, -6, 21])
-
-  def testScalarMinusVectorExplicitNumberingF32(self):
-    # Use explicit numbering and pass parameter_num first. Sub is used since
-    # it's not commutative and can help catch parameter reversal within the
-    # computation.
-    c = self._NewComputation()
-    p1 = c.ParameterFromNumpy(self.f32_4vector, parameter_num=1)
-    p0 = c.ParameterFromNumpy(self.f32_scalar_2, parameter_num=0)
-    c.Sub(p1, p0)
-    self._ExecuteAndCompareClose(
-        c,
-        arguments=[self.f32_scalar_2, self.f32_4vector],
-        expected=[-4.3, 1.3, -6.3, 3.3])
-
-  def testScalarMinusVectorExplicitNumberingF64(self):
+  def testScalarTimesVectorAutonumberFloat(self):
+    for array_fun, _ in _FLOAT_TYPES:
+      scalar = array_fun(2.0)
+      vector = array_fun([-2.3, 3.3, -4.3, 5.3])
+      c = self._NewComputation()
+      p0 = c.ParameterFromNumpy(scalar)
+      p1 = c.ParameterFromNumpy(vector)
+      c.Mul(p0, p1)
+      self._ExecuteAndCompareClose(
+          c,
+          arguments=[scalar, vector],
+          expected=[-4.6, 6.6, -8.6, 10.6])
+
+  def testScalarTimesVectorInt(self):
+    for array_fun, _ in _INT_TYPES:
+      scalar = array_fun(3)
+      vector = array_fun([10, 15, -2, 7])
+      c = self._NewComputation()
+      p0 = c.ParameterFromNumpy(scalar)
+      p1 = c.ParameterFromNumpy(vector)
+      c.Mul(p0, p1)
+      self._ExecuteAndCompareExact(
+          c,
+          arguments=[scalar, vector],
+          expected=[30, 45, -6, 21])
+
+  def testScalarMinusVectorExplicitNumberingFloat(self):
     # Use explicit numbering and pass parameter_num first. Sub is used since
     # it's not commutative and can help catch parameter reversal within the
     # computation.
-    c = self._NewComputation()
-    p1 = c.ParameterFromNumpy(self.f64_4vector, parameter_num=1)
-    p0 = c.ParameterFromNumpy(self.f64_scalar_2, parameter_num=0)
-    c.Sub(p1, p0)
-    self._ExecuteAndCompareClose(
-        c,
-        arguments=[self.f64_scalar_2, self.f64_4vector],
-        expected=[-4.3, 1.3, -6.3, 3.3])
+    for array_fun, _ in _FLOAT_TYPES:
+      scalar = array_fun(2.0)
+      vector = array_fun([-2.3, 3.3, -4.3, 5.3])
+      c = self._NewComputation()
+      p1 = c.ParameterFromNumpy(vector, parameter_num=1)
+      p0 = c.ParameterFromNumpy(scalar, parameter_num=0)
+      c.Sub(p1, p0)
+      self._ExecuteAndCompareClose(
+          c,
+          arguments=[scalar, vector],
+          expected=[-4.3, 1.3, -6.3, 3.3])
 
 
 class LocalBufferTest(LocalComputationTest):
   """Tests focusing on execution with LocalBuffers."""
 
+  @classmethod
+  def setUpClass(cls):
+    # Argument buffers shared by the tests of this class, keyed by contents.
+    cls._buffer_cache = {}
+
+  @classmethod
+  def tearDownClass(cls):
+    for arg_buffer in cls._buffer_cache.values():
+      arg_buffer.delete()
+    cls._buffer_cache.clear()
+
+  def _LocalBuffer(self, arg):
+    key = (arg.tobytes(), arg.shape, arg.dtype.str)
+    arg_buffer = self._buffer_cache.get(key)
+    if arg_buffer is None:
+      arg_buffer = xla_client.LocalBuffer.from_py(arg)
+      self._buffer_cache[key] = arg_buffer
+    return arg_buffer
+
   def _Execute(self, c, arguments):
-    compiled_c = c.Build().CompileWithExampleArguments(arguments)
-    arg_buffers = [xla_client.LocalBuffer.from_py(arg) for arg in arguments]
+    compiled_c = self._Compile(c, arguments)
+    arg_buffers = [self._LocalBuffer(arg) for arg in arguments]
     result_buffer = compiled_c.ExecuteWithLocalBuffers(arg_buffers)
     return result_buffer.to_py()
 
@@ -328,7 +344,7 @@ class LocalBufferTest(LocalComputationTest):
 
   def testOneParameterSum(self):
     c = self._NewComputation()
-    c.Add(c.ParameterFromNumpy(NumpyArrayF32(0.)), c.ConstantF32Scalar(3.14))
+    c.Add(c.ParameterFromNumpy(_F32_SCALAR_SENTINEL), c.ConstantF32Scalar(3.14))
     self._ExecuteAndCompareClose(
         c,
         arguments=[NumpyArrayF32(1.11)],
@@ -336,8 +352,8 @@ class LocalBufferTest(LocalComputationTest):
 
   def testTwoParameterSum(self):
     c = self._NewComputation()
-    c.Add(c.ParameterFromNumpy(NumpyArrayF32(0.)),
-          c.ParameterFromNumpy(NumpyArrayF32(0.)))
+    c.Add(c.ParameterFromNumpy(_F32_SCALAR_SENTINEL),
+          c.ParameterFromNumpy(_F32_SCALAR_SENTINEL))
     self._ExecuteAndCompareClose(
         c,
         arguments=[NumpyArrayF32(1.11), NumpyArrayF32(3.14)],
@@ -345,7 +361,7 @@ class LocalBufferTest(LocalComputationTest):
 
   def testCannotCallWithDeletedBuffers(self):
     c = self._NewComputation()
-    c.Add(c.ParameterFromNumpy(NumpyArrayF32(0.)), c.ConstantF32Scalar(3.14))
+    c.Add(c.ParameterFromNumpy(_F32_SCALAR_SENTINEL), c.ConstantF32Scalar(3.14))
     arg = NumpyArrayF32(1.11)
     compiled_c = c.Build().CompileWithExampleArguments([arg])
     arg_buffer = xla_client.LocalBuffer.from_py(arg)
@@ -354,6 +370,37 @@ class LocalBufferTest(LocalComputationTest):
       compiled_c.ExecuteWithLocalBuffers([arg_buffer])
 
 
+# XLA element types of the dtypes that testConvertElementType converts between.
+_XLA_TYPES = {
+    np.bool: xla_client.xla_data_pb2.PRED,
+    np.int32: xla_client.xla_data_pb2.S32,
+    np.int64: xla_client.xla_data_pb2.S64,
+    np.float32: xla_client.xla_data_pb2.F32,
+    np.float64: xla_client.xla_data_pb2.F64,
+}
+_XLA_TYPE_KEYS = tuple(_XLA_TYPES)
+
+
+def _ArangeF32(*dims):
+  return np.arange(np.prod(dims)).reshape(dims).astype("float32")
+
+
+# Operands and expected results of the convolution tests in SingleOpTest.
+_CONV_LHS = _ReadOnly(_ArangeF32(1, 2, 3, 4))
+_CONV_RHS = _ReadOnly(_ArangeF32(1, 2, 1, 2) * 10)
+_CONV_SAME_EXPECTED = _ReadOnly(np.array([[[[640., 700., 760., 300.],
+                                            [880., 940., 1000., 380.],
+                                            [1120., 1180., 1240., 460.]]]]))
+_CONV_VALID_EXPECTED = _ReadOnly(np.array([[[[640., 700., 760.],
+                                             [1120., 1180., 1240.]]]]))
+_CONV_GENERAL_PADDING_LHS = _ReadOnly(_ArangeF32(1, 1, 2, 3))
+_CONV_GENERAL_PADDING_RHS = _ReadOnly(_ArangeF32(1, 1, 1, 2) * 10)
+_CONV_GENERAL_PADDING_EXPECTED = _ReadOnly(np.array([[[[0., 0., 0.],
+                                                       [10., 20., 0.],
+                                                       [0., 0., 0.],
+                                                       [40., 50., 0.]]]]))
+
+
 class SingleOpTest(LocalComputationTest):
   """Tests for single ops.
 
@@ -362,46 +409,37 @@ class SingleOpTest(LocalComputationTest):
   around the op being tested.
   """
 
-  def testConcatenateF32(self):
-    c = self._NewComputation()
-    c.Concatenate(
-        (c.Constant(NumpyArrayF32([1.0, 2.0, 3.0])),
-         c.Constant(NumpyArrayF32([4.0, 5.0, 6.0]))),
-        dimension=0)
-    self._ExecuteAndCompareClose(c, expected=[1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
-
-  def testConcatenateF64(self):
-    c = self._NewComputation()
-    c.Concatenate(
-        (c.Constant(NumpyArrayF64([1.0, 2.0, 3.0])),
-         c.Constant(NumpyArrayF64([4.0, 5.0, 6.0]))),
-        dimension=0)
-    self._ExecuteAndCompareClose(c, expected=[1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+  def testConcatenate(self):
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      c.Concatenate(
+          (c.Constant(array_fun([1.0, 2.0, 3.0])),
+           c.Constant(array_fun([4.0, 5.0, 6.0]))),
+          dimension=0)
+      self._ExecuteAndCompareClose(c, expected=[1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
 
   def testConvertElementType(self):
-    xla_types = {
-        np.bool: xla_client.xla_data_pb2.PRED,
-        np.int32: xla_client.xla_data_pb2.S32,
-        np.int64: xla_client.xla_data_pb2.S64,
-        np.float32: xla_client.xla_data_pb2.F32,
-        np.float64: xla_client.xla_data_pb2.F64,
-    }
-
-    def _ConvertAndTest(template, src_dtype, dst_dtype):
+
+    def _ConvertAndTest(template, src_dtype):
+      # Convert to every destination type at once, as one tuple-shaped result.
       c = self._NewComputation()
       x = c.Constant(np.array(template, dtype=src_dtype))
-      c.ConvertElementType(x, xla_types[dst_dtype])
+      c.Tuple(*[c.ConvertElementType(x, _XLA_TYPES[dst_dtype])
+                for dst_dtype in _XLA_TYPE_KEYS])
 
-      result = c.Build().Compile().Execute()
-      expected = np.array(template, dtype=dst_dtype)
+      results = c.Build().Compile().Execute()
+      self.assertEqual(len(results), len(_XLA_TYPE_KEYS))
+      for result, dst_dtype in zip(results, _XLA_TYPE_KEYS):
+        expected = np.array(template, dtype=dst_dtype)
+        msg = "converting %s to %s" % (np.dtype(src_dtype), np.dtype(dst_dtype))
 
-      self.assertEqual(result.shape, expected.shape)
-      self.assertEqual(result.dtype, expected.dtype)
-      np.testing.assert_equal(result, expected)
+        self.assertEqual(result.shape, expected.shape, msg)
+        self.assertEqual(result.dtype, expected.dtype, msg)
+        np.testing.assert_equal(result, expected, err_msg=msg)
 
     x = [0, 1, 0, 0, 1]
-    for src_dtype, dst_dtype in itertools.product(xla_types, xla_types):
-      _ConvertAndTest(x, src_dtype, dst_dtype)
+    for src_dtype in _XLA_TYPE_KEYS:
+      _ConvertAndTest(x, src_dtype)
 
   def testCrossReplicaSumOneReplica(self):
     samples = [
@@ -415,79 +453,44 @@ class SingleOpTest(LocalComputationTest):
       c.CrossReplicaSum(c.Constant(lhs))
       self._ExecuteAndCompareExact(c, expected=lhs)
 
-  def testDotMatrixVectorF32(self):
-    c = self._NewComputation()
-    lhs = NumpyArrayF32([[2.0, 3.0], [4.0, 5.0]])
-    rhs = NumpyArrayF32([[10.0], [20.0]])
-    c.Dot(c.Constant(lhs), c.Constant(rhs))
-    self._ExecuteAndCompareClose(c, expected=np.dot(lhs, rhs))
-
-  def testDotMatrixVectorF64(self):
-    c = self._NewComputation()
-    lhs = NumpyArrayF64([[2.0, 3.0], [4.0, 5.0]])
-    rhs = NumpyArrayF64([[10.0], [20.0]])
-    c.Dot(c.Constant(lhs), c.Constant(rhs))
-    self._ExecuteAndCompareClose(c, expected=np.dot(lhs, rhs))
-
-  def testDotMatrixMatrixF32(self):
-    c = self._NewComputation()
-    lhs = NumpyArrayF32([[2.0, 3.0], [4.0, 5.0]])
-    rhs = NumpyArrayF32([[10.0, 20.0], [100.0, 200.0]])
-    c.Dot(c.Constant(lhs), c.Constant(rhs))
-    self._ExecuteAndCompareClose(c, expected=np.dot(lhs, rhs))
+  def testDotMatrixVector(self):
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      lhs = array_fun([[2.0, 3.0], [4.0, 5.0]])
+      rhs = array_fun([[10.0], [20.0]])
+      c.Dot(c.Constant(lhs), c.Constant(rhs))
+      self._ExecuteAndCompareClose(c, expected=np.dot(lhs, rhs))
 
-  def testDotMatrixMatrixF64(self):
-    c = self._NewComputation()
-    lhs = NumpyArrayF64([[2.0, 3.0], [4.0, 5.0]])
-    rhs = NumpyArrayF64([[10.0, 20.0], [100.0, 200.0]])
-    c.Dot(c.Constant(lhs), c.Constant(rhs))
-    self._ExecuteAndCompareClose(c, expected=np.dot(lhs, rhs))
+  def testDotMatrixMatrix(self):
+    for array_fun, _ in _FLOAT_TYPES:
+      c = self._NewComputation()
+      lhs = array_fun([[2.0, 3.0], [4.0, 5.0]])
+      rhs = array_fun([[10.0, 20.0], [100.0, 200.0]])
+      c.Dot(c.Constant(lhs), c.Constant(rhs))
+      self._ExecuteAndCompareClose(c, expected=np.dot(lhs, rhs))
 
   def testConvF32Same(self):
     c = self._NewComputation()
-    a = lambda *dims: np.arange(np.prod(dims)).reshape(dims).astype("float32")
-    lhs = a(1, 2, 3, 4)
-    rhs = a(1, 2, 1, 2) * 10
-    c.Conv(c.Constant(lhs), c.Constant(rhs),
+    c.Conv(c.Constant(_CONV_LHS), c.Constant(_CONV_RHS),
            [1, 1], xla_client.PaddingType.SAME)
-    result = np.array([[[[640., 700., 760., 300.],
-                         [880., 940., 1000., 380.],
-                         [1120., 1180., 1240., 460.]]]])
-    self._ExecuteAndCompareClose(c, expected=result)
+    self._ExecuteAndCompareClose(c, expected=_CONV_SAME_EXPECTED)
 
   def testConvF32Valid(self):
     c = self._NewComputation()
-    a = lambda *dims: np.arange(np.prod(dims)).reshape(dims).astype("float32")
-    lhs = a(1, 2, 3, 4)
-    rhs = a(1, 2, 1, 2) * 10
-    c.Conv(c.Constant(lhs), c.Constant(rhs),
+    c.Conv(c.Constant(_CONV_LHS), c.Constant(_CONV_RHS),
            [2, 1], xla_client.PaddingType.VALID)
-    result = np.array([[[[640., 700., 760.],
-                         [1120., 1180., 1240.]]]])
-    self._ExecuteAndCompareClose(c, expected=result)
+    self._ExecuteAndCompareClose(c, expected=_CONV_VALID_EXPECTED)
 
   def testConvWithGeneralPaddingF32(self):
     c = self._NewComputation()
-    a = lambda *dims: np.arange(np.prod(dims)).reshape(dims).astype("float32")
-    lhs = a(1, 1, 2, 3)
-    rhs = a(1, 1, 1, 2) * 10
     strides = [1, 1]
     pads = [(1, 0), (0, 1)]
     lhs_dilation = (2, 1)
     rhs_dilation = (1, 1)
-    c.ConvWithGeneralPadding(c.Constant(lhs), c.Constant(rhs),
+    c.ConvWithGeneralPadding(c.Constant(_CONV_GENERAL_PADDING_LHS),
+                             c.Constant(_CONV_GENERAL_PADDING_RHS),
                              strides, pads, lhs_dilation, rhs_dilation)
-    result = np.array([[[[0., 0., 0.],
-                         [10., 20., 0.],
-                         [0., 0., 0.],
-                         [40., 50., 0.]]]])
-    self._ExecuteAndCompareClose(c, expected=result)
-
-  def testBooleanNot(self):
-    c = self._NewComputation()
-    arr = NumpyArrayBool([True, False, True])
-    c.Not(c.Constant(arr))
-    self._ExecuteAndCompareClose(c, expected=~arr)
+    self._ExecuteAndCompareClose(c, expected=_CONV_GENERAL_PADDING_EXPECTED)
 
   def testExp(self):
     c = self._NewComputation()
@@ -547,71 +550,47 @@ class SingleOpTest(LocalComputationTest):
 
   def testTranspose(self):
 
-    def _TransposeAndTest(array, permutation):
+    def _TransposeAndTest(array, permutations):
       c = self._NewComputation()
-      c.Transpose(c.Constant(array), permutation)
-      expected = np.transpose(array, permutation)
-      self._ExecuteAndCompareClose(c, expected=expected)
+      x = c.Constant(array)
+      self._BatchExecuteAndCompareClose(
+          c,
+          cases=[(c.Transpose(x, permutation), np.transpose(array, permutation))
+                 for permutation in permutations])
 
-    _TransposeAndTest(NumpyArrayF32([[1, 2, 3], [4, 5, 6]]), [0, 1])
-    _TransposeAndTest(NumpyArrayF32([[1, 2, 3], [4, 5, 6]]), [1, 0])
-    _TransposeAndTest(NumpyArrayF32([[1, 2], [4, 5]]), [0, 1])
-    _TransposeAndTest(NumpyArrayF32([[1, 2], [4, 5]]), [1, 0])
+    _TransposeAndTest(NumpyArrayF32([[1, 2, 3], [4, 5, 6]]), [[0, 1], [1, 0]])
+    _TransposeAndTest(NumpyArrayF32([[1, 2], [4, 5]]), [[0, 1], [1, 0]])
 
     arr = np.random.RandomState(0).randn(2, 3, 4).astype(np.float32)
-    for permutation in itertools.permutations(range(arr.ndim)):
-      _TransposeAndTest(arr, permutation)
-      _TransposeAndTest(np.asfortranarray(arr), permutation)
-
-  def testEq(self):
-    c = self._NewComputation()
-    c.Eq(
-        c.Constant(NumpyArrayS32([1, 2, 3, 4])),
-        c.Constant(NumpyArrayS32([4, 2, 3, 1])))
-    self._ExecuteAndCompareExact(c, expected=[False, True, True, False])
-
-  def testNe(self):
-    c = self._NewComputation()
-    c.Ne(
-        c.Constant(NumpyArrayS32([1, 2, 3, 4])),
-        c.Constant(NumpyArrayS32([4, 2, 3, 1])))
-    self._ExecuteAndCompareExact(c, expected=[True, False, False, True])
-
-    c.Ne(
-        c.Constant(NumpyArrayF32([-2.0, 0.0,
-                                  float("nan"),
-                                  float("nan")])),
-        c.Constant(NumpyArrayF32([2.0, -0.0, 1.0, float("nan")])))
-    self._ExecuteAndAssertWith(
-        np.testing.assert_allclose, c, (), expected=[True, False, True, True])
-
-  def testGt(self):
-    c = self._NewComputation()
-    c.Gt(
-        c.Constant(NumpyArrayS32([1, 2, 3, 4, 9])),
-        c.Constant(NumpyArrayS32([1, 0, 2, 7, 12])))
-    self._ExecuteAndCompareExact(c, expected=[False, True, True, False, False])
-
-  def testGe(self):
-    c = self._NewComputation()
-    c.Ge(
-        c.Constant(NumpyArrayS32([1, 2, 3, 4, 9])),
-        c.Constant(NumpyArrayS32([1, 0, 2, 7, 12])))
-    self._ExecuteAndCompareExact(c, expected=[True, True, True, False, False])
-
-  def testLt(self):
-    c = self._NewComputation()
-    c.Lt(
-        c.Constant(NumpyArrayS32([1, 2, 3, 4, 9])),
-        c.Constant(NumpyArrayS32([1, 0, 2, 7, 12])))
-    self._ExecuteAndCompareExact(c, expected=[False, False, False, True, True])
-
-  def testLe(self):
-    c = self._NewComputation()
-    c.Le(
-        c.Constant(NumpyArrayS32([1, 2, 3, 4, 9])),
-        c.Constant(NumpyArrayS32([1, 0, 2, 7, 12])))
-    self._ExecuteAndCompareExact(c, expected=[True, False, False, True, True])
+    permutations = list(itertools.permutations(range(arr.ndim)))
+    _TransposeAndTest(arr, permutations)
+    _TransposeAndTest(np.asfortranarray(arr), permutations)
+
+  def testComparisonSuite(self):
+    # The logical and comparison ops are checked together, as the elements of
+    # a single tuple-shaped result.
+    c = self._NewComputation()
+    bool_lhs = c.Constant(NumpyArrayBool([True, False, True, False]))
+    bool_rhs = c.Constant(NumpyArrayBool([True, True, False, False]))
+    eq_lhs = c.Constant(NumpyArrayS32([1, 2, 3, 4]))
+    eq_rhs = c.Constant(NumpyArrayS32([4, 2, 3, 1]))
+    nan_lhs = c.Constant(NumpyArrayF32([-2.0, 0.0, float("nan"),
+                                        float("nan")]))
+    nan_rhs = c.Constant(NumpyArrayF32([2.0, -0.0, 1.0, float("nan")]))
+    lhs = c.Constant(NumpyArrayS32([1, 2, 3, 4, 9]))
+    rhs = c.Constant(NumpyArrayS32([1, 0, 2, 7, 12]))
+    self._BatchExecuteAndCompareExact(c, cases=[
+        (c.And(bool_lhs, bool_rhs), [True, False, False, False]),
+        (c.Or(bool_lhs, bool_rhs), [True, True, True, False]),
+        (c.Not(bool_lhs), [False, True, False, True]),
+        (c.Eq(eq_lhs, eq_rhs), [False, True, True, False]),
+        (c.Ne(eq_lhs, eq_rhs), [True, False, False, True]),
+        (c.Ne(nan_lhs, nan_rhs), [True, False, True, True]),
+        (c.Gt(lhs, rhs), [False, True, True, False, False]),
+        (c.Ge(lhs, rhs), [True, True, True, False, False]),
+        (c.Lt(lhs, rhs), [False, False, False, True, True]),
+        (c.Le(lhs, rhs), [True, False, False, True, True]),
+    ])
 
   def testMax(self):
     c = self._NewComputation()
@@ -758,314 +737,277 @@ class SingleOpTest(LocalComputationTest):
     self.assertTrue(np.all(result < hi))
 
 
+# Inputs of the tests in EmbeddedComputationsTest.
+_VECTOR_F32 = _ReadOnly(NumpyArrayF32([1.0, 2.0, 3.0, 4.0]))
+_VECTOR_F64 = _ReadOnly(NumpyArrayF64([1.0, 2.0, 3.0, 4.0]))
+_DIVISOR_VECTOR_F32 = _ReadOnly(NumpyArrayF32([5.0, 5.0, 4.0, 4.0]))
+_DIVISOR_VECTOR_F64 = _ReadOnly(NumpyArrayF64([5.0, 5.0, 4.0, 4.0]))
+_MATRIX_F32 = _ReadOnly(NumpyArrayF32([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]))
+_MATRIX_F64 = _ReadOnly(NumpyArrayF64([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]))
+_SAMPLE_3D_ARRAY_F32 = _ReadOnly(NumpyArrayF32(
+    [[[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]],
+     [[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]]]))
+_SAMPLE_3D_ARRAY_F64 = _ReadOnly(NumpyArrayF64(
+    [[[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]],
+     [[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]]]))
+
+# Element-type specific inputs, constant builder methods and built helper
+# computations, for the dtype-generic tests of EmbeddedComputationsTest.
+_FloatTypeHelpers = collections.namedtuple("_FloatTypeHelpers", [
+    "constant_scalar", "vector", "divisor_vector", "matrix", "sample_3d_array",
+    "constant_one", "int_constant_one", "mul_by_2", "add", "div", "lt_10"
+])
+
+
+def _BuildOnce(create_computation):
+  """Memoizes, per arguments, a method building computations for all tests."""
+  computations = {}
+
+  @functools.wraps(create_computation)
+  def Create(self, *args):
+    if args not in computations:
+      computations[args] = create_computation(self, *args)
+    return computations[args]
+
+  return Create
+
+
 class EmbeddedComputationsTest(LocalComputationTest):
   """Tests for XLA graphs with embedded computations (such as maps)."""
 
-  def _CreateConstantS32Computation(self):
-    """Computation (f32) -> s32 that returns a constant 1 for any input."""
-    c = self._NewComputation("constant_s32_one")
+  @_BuildOnce
+  def _ConstantComputation(self, param_dtype, dtype, value):
+    """Computation (param_dtype) -> dtype returning a constant for any input."""
+    c = self._NewComputation("constant_%s_%s" % (np.dtype(dtype).name, value))
     # TODO (eliben): consider adding a nicer way to create new parameters without id:264 gh:265
     # having to create dummy Numpy arrays or populating Shape messages. Perhaps
     # we need our own (Python-client-own) way to represent Shapes conveniently.
-    c.ParameterFromNumpy(NumpyArrayF32(0))
-    c.ConstantS32Scalar(1)
-    return c.Build()
-
-  def _CreateConstantS64Computation(self):
-    """Computation (f64) -> s64 that returns a constant 1 for any input."""
-    c = self._NewComputation("constant_s64_one")
-    # TODO (eliben): consider adding a nicer way to create new parameters without id:303 gh:304
-    # having to create dummy Numpy arrays or populating Shape messages. Perhaps
-    # we need our own (Python-client-own) way to represent Shapes conveniently.
-    c.ParameterFromNumpy(NumpyArrayF64(0))
-    c.ConstantS64Scalar(1)
-    return c.Build()
-
-  def _CreateConstantF32Computation(self):
-    """Computation (f32) -> f32 that returns a constant 1.0 for any input."""
-    c = self._NewComputation("constant_f32_one")
-    c.ParameterFromNumpy(NumpyArrayF32(0))
-    c.ConstantF32Scalar(1.0)
-    return c.Build()
-
-  def _CreateConstantF64Computation(self):
-    """Computation (f64) -> f64 that returns a constant 1.0 for any input."""
-    c = self._NewComputation("constant_f64_one")
-    c.ParameterFromNumpy(NumpyArrayF64(0))
-    c.ConstantF64Scalar(1.0)
+    c.ParameterFromNumpy(_SCALAR_SENTINELS[param_dtype])
+    c.Constant(np.array(value, dtype=dtype))
     return c.Build()
 
+  @_BuildOnce
   def _CreateMulF32By2Computation(self):
     """Computation (f32) -> f32 that multiplies its parameter by 2."""
     c = self._NewComputation("mul_f32_by2")
-    c.Mul(c.ParameterFromNumpy(NumpyArrayF32(0)), c.ConstantF32Scalar(2.0))
+    c.Mul(c.ParameterFromNumpy(_F32_SCALAR_SENTINEL), c.ConstantF32Scalar(2.0))
     return c.Build()
 
+  @_BuildOnce
   def _CreateMulF64By2Computation(self):
     """Computation (f64) -> f64 that multiplies its parameter by 2."""
     c = self._NewComputation("mul_f64_by2")
-    c.Mul(c.ParameterFromNumpy(NumpyArrayF64(0)), c.ConstantF64Scalar(2.0))
+    c.Mul(c.ParameterFromNumpy(_F64_SCALAR_SENTINEL), c.ConstantF64Scalar(2.0))
     return c.Build()
 
+  @_BuildOnce
   def _CreateBinaryAddF32Computation(self):
     """Computation (f32, f32) -> f32 that adds its two parameters."""
     c = self._NewComputation("add_param0_by_param1")
     c.Add(
-        c.ParameterFromNumpy(NumpyArrayF32(0)),
-        c.ParameterFromNumpy(NumpyArrayF32(0)))
+        c.ParameterFromNumpy(_F32_SCALAR_SENTINEL),
+        c.ParameterFromNumpy(_F32_SCALAR_SENTINEL))
     return c.Build()
 
+  @_BuildOnce
   def _CreateBinaryAddF64Computation(self):
     """Computation (f64, f64) -> f64 that adds its two parameters."""
     c = self._NewComputation("add_param0_by_param1")
     c.Add(
-        c.ParameterFromNumpy(NumpyArrayF64(0)),
-        c.ParameterFromNumpy(NumpyArrayF64(0)))
+        c.ParameterFromNumpy(_F64_SCALAR_SENTINEL),
+        c.ParameterFromNumpy(_F64_SCALAR_SENTINEL))
     return c.Build()
 
+  @_BuildOnce
   def _CreateBinaryDivF32Computation(self):
     """Computation (f32, f32) -> f32 that divides its two parameters."""
     c = self._NewComputation("div_param0_by_param1")
     c.Div(
-        c.ParameterFromNumpy(NumpyArrayF32(0)),
-        c.ParameterFromNumpy(NumpyArrayF32(0)))
+        c.ParameterFromNumpy(_F32_SCALAR_SENTINEL),
+        c.ParameterFromNumpy(_F32_SCALAR_SENTINEL))
     return c.Build()
 
+  @_BuildOnce
   def _CreateBinaryDivF64Computation(self):
     """Computation (f64, f64) -> f64 that divides its two parameters."""
     c = self._NewComputation("div_param0_by_param1")
     c.Div(
-        c.ParameterFromNumpy(NumpyArrayF64(0)),
-        c.ParameterFromNumpy(NumpyArrayF64(0)))
+        c.ParameterFromNumpy(_F64_SCALAR_SENTINEL),
+        c.ParameterFromNumpy(_F64_SCALAR_SENTINEL))
     return c.Build()
 
+  @_BuildOnce
   def _CreateTestF32Lt10Computation(self):
     """Computation (f32) -> bool that tests if its parameter is less than 10."""
     c = self._NewComputation("test_f32_lt_10")
-    c.Lt(c.ParameterFromNumpy(NumpyArrayF32(0)), c.ConstantF32Scalar(10.))
+    c.Lt(c.ParameterFromNumpy(_F32_SCALAR_SENTINEL), c.ConstantF32Scalar(10.))
     return c.Build()
 
+  @_BuildOnce
   def _CreateTestF64Lt10Computation(self):
     """Computation (f64) -> bool that tests if its parameter is less than 10."""
     c = self._NewComputation("test_f64_lt_10")
-    c.Lt(c.ParameterFromNumpy(NumpyArrayF64(0)), c.ConstantF64Scalar(10.))
+    c.Lt(c.ParameterFromNumpy(_F64_SCALAR_SENTINEL), c.ConstantF64Scalar(10.))
     return c.Build()
 
-  def _MakeSample3DArrayF32(self):
-    return NumpyArrayF32([[[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]],
-                          [[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]]])
-
-  def _MakeSample3DArrayF64(self):
-    return NumpyArrayF64([[[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]],
-                          [[1, 2, 3], [4, 5, 6]], [[1, 2, 3], [4, 5, 6]]])
-
-  def testCallF32(self):
-    c = self._NewComputation()
-    c.Call(
-        self._CreateMulF32By2Computation(),
-        operands=(c.ConstantF32Scalar(5.0),))
-    self._ExecuteAndCompareClose(c, expected=10.0)
-
-  def testCallF64(self):
-    c = self._NewComputation()
-    c.Call(
-        self._CreateMulF64By2Computation(),
-        operands=(c.ConstantF64Scalar(5.0),))
-    self._ExecuteAndCompareClose(c, expected=10.0)
-
-  def testMapEachElementToS32Constant(self):
-    c = self._NewComputation()
-    c.Map([c.Constant(NumpyArrayF32([1.0, 2.0, 3.0, 4.0]))],
-          self._CreateConstantS32Computation(), [0])
-    self._ExecuteAndCompareExact(c, expected=[1, 1, 1, 1])
-
-  def testMapEachElementToS64Constant(self):
-    c = self._NewComputation()
-    c.Map([c.Constant(NumpyArrayF64([1.0, 2.0, 3.0, 4.0]))],
-          self._CreateConstantS64Computation(), [0])
-    self._ExecuteAndCompareExact(c, expected=[1, 1, 1, 1])
-
-  def testMapMulBy2F32(self):
-    c = self._NewComputation()
-    c.Map([c.Constant(NumpyArrayF32([1.0, 2.0, 3.0, 4.0]))],
-          self._CreateMulF32By2Computation(), [0])
-    self._ExecuteAndCompareClose(c, expected=[2.0, 4.0, 6.0, 8.0])
-
-  def testMapMulBy2F64(self):
-    c = self._NewComputation()
-    c.Map([c.Constant(NumpyArrayF64([1.0, 2.0, 3.0, 4.0]))],
-          self._CreateMulF64By2Computation(), [0])
-    self._ExecuteAndCompareClose(c, expected=[2.0, 4.0, 6.0, 8.0])
-
-  def testSimpleMapChainF32(self):
-    # Chains a map of constant-f32 with a map of mul-by-2
-    c = self._NewComputation()
-    const_f32 = c.Map([c.Constant(NumpyArrayF32([1.0, 2.0, 3.0, 4.0]))],
-                      self._CreateConstantF32Computation(), [0])
-    c.Map([const_f32], self._CreateMulF32By2Computation(), [0])
-    self._ExecuteAndCompareClose(c, expected=[2.0, 2.0, 2.0, 2.0])
-
-  def testSimpleMapChainF64(self):
-    # Chains a map of constant-f64 with a map of mul-by-2
-    c = self._NewComputation()
-    const_f64 = c.Map([c.Constant(NumpyArrayF64([1.0, 2.0, 3.0, 4.0]))],
-                      self._CreateConstantF64Computation(), [0])
-    c.Map([const_f64], self._CreateMulF64By2Computation(), [0])
-    self._ExecuteAndCompareClose(c, expected=[2.0, 2.0, 2.0, 2.0])
-
-  def testDivVectorsWithMapF32(self):
-    c = self._NewComputation()
-    c.Map((c.Constant(NumpyArrayF32([1.0, 2.0, 3.0, 4.0])),
-           c.Constant(NumpyArrayF32([5.0, 5.0, 4.0, 4.0]))),
-          self._CreateBinaryDivF32Computation(), [0])
-    self._ExecuteAndCompareClose(c, expected=[0.2, 0.4, 0.75, 1.0])
-
-  def testDivVectorsWithMapF64(self):
-    c = self._NewComputation()
-    c.Map((c.Constant(NumpyArrayF64([1.0, 2.0, 3.0, 4.0])),
-           c.Constant(NumpyArrayF64([5.0, 5.0, 4.0, 4.0]))),
-          self._CreateBinaryDivF64Computation(), [0])
-    self._ExecuteAndCompareClose(c, expected=[0.2, 0.4, 0.75, 1.0])
-
-  def testReduce1DtoScalarF32(self):
-    c = self._NewComputation()
-    c.Reduce(
-        operand=c.Constant(NumpyArrayF32([1.0, 2.0, 3.0, 4.0])),
-        init_value=c.ConstantF32Scalar(0),
-        computation_to_apply=self._CreateBinaryAddF32Computation(),
-        dimensions=[0])
-    self._ExecuteAndCompareClose(c, expected=10)
-
-  def testReduce1DtoScalarF64(self):
-    c = self._NewComputation()
-    c.Reduce(
-        operand=c.Constant(NumpyArrayF64([1.0, 2.0, 3.0, 4.0])),
-        init_value=c.ConstantF64Scalar(0),
-        computation_to_apply=self._CreateBinaryAddF64Computation(),
-        dimensions=[0])
-    self._ExecuteAndCompareClose(c, expected=10)
-
-  def testReduce2DTo1DDim0F32(self):
-    input_array = NumpyArrayF32([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
-    c = self._NewComputation()
-    c.Reduce(
-        operand=c.Constant(input_array),
-        init_value=c.ConstantF32Scalar(0),
-        computation_to_apply=self._CreateBinaryAddF32Computation(),
-        dimensions=[0])
-    self._ExecuteAndCompareClose(c, expected=[5, 7, 9])
-
-  def testReduce2DTo1DDim0F64(self):
-    input_array = NumpyArrayF64([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
-    c = self._NewComputation()
-    c.Reduce(
-        operand=c.Constant(input_array),
-        init_value=c.ConstantF64Scalar(0),
-        computation_to_apply=self._CreateBinaryAddF64Computation(),
-        dimensions=[0])
-    self._ExecuteAndCompareClose(c, expected=[5, 7, 9])
-
-  def testReduce2DTo1DDim1F32(self):
-    input_array = NumpyArrayF32([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
-    c = self._NewComputation()
-    c.Reduce(
-        operand=c.Constant(input_array),
-        init_value=c.ConstantF32Scalar(0),
-        computation_to_apply=self._CreateBinaryAddF32Computation(),
-        dimensions=[1])
-    self._ExecuteAndCompareClose(c, expected=[6, 15])
-
-  def testReduce2DTo1DDim1F64(self):
-    input_array = NumpyArrayF64([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
-    c = self._NewComputation()
-    c.Reduce(
-        operand=c.Constant(input_array),
-        init_value=c.ConstantF64Scalar(0),
-        computation_to_apply=self._CreateBinaryAddF64Computation(),
-        dimensions=[1])
-    self._ExecuteAndCompareClose(c, expected=[6, 15])
-
-  def testReduce3DAllPossibleWaysF32(self):
-    input_array = self._MakeSample3DArrayF32()
-
-    def _ReduceAndTest(*dims):
+  @_BuildOnce
+  def _FloatTypes(self):
+    """Returns the helpers of the F32 and F64 variants of the tests below."""
+    (_, constant_f32), (_, constant_f64) = _FLOAT_TYPES
+    return (
+        _FloatTypeHelpers(
+            constant_scalar=constant_f32,
+            vector=_VECTOR_F32,
+            divisor_vector=_DIVISOR_VECTOR_F32,
+            matrix=_MATRIX_F32,
+            sample_3d_array=_SAMPLE_3D_ARRAY_F32,
+            constant_one=self._ConstantComputation(np.float32, np.float32, 1),
+            int_constant_one=self._ConstantComputation(np.float32, np.int32, 1),
+            mul_by_2=self._CreateMulF32By2Computation(),
+            add=self._CreateBinaryAddF32Computation(),
+            div=self._CreateBinaryDivF32Computation(),
+            lt_10=self._CreateTestF32Lt10Computation()),
+        _FloatTypeHelpers(
+            constant_scalar=constant_f64,
+            vector=_VECTOR_F64,
+            divisor_vector=_DIVISOR_VECTOR_F64,
+            matrix=_MATRIX_F64,
+            sample_3d_array=_SAMPLE_3D_ARRAY_F64,
+            constant_one=self._ConstantComputation(np.float64, np.float64, 1),
+            int_constant_one=self._ConstantComputation(np.float64, np.int64, 1),
+            mul_by_2=self._CreateMulF64By2Computation(),
+            add=self._CreateBinaryAddF64Computation(),
+            div=self._CreateBinaryDivF64Computation(),
+            lt_10=self._CreateTestF64Lt10Computation()),
+    )
+
+  def testCall(self):
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      cases.append((c.Call(t.mul_by_2, operands=(t.constant_scalar(c, 5.0),)),
+                    10.0))
+    self._BatchExecuteAndCompareExactFP(c, cases=cases)
+
+  def testMapEachElementToIntConstant(self):
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      cases.append((c.Map([c.Constant(t.vector)], t.int_constant_one, [0]),
+                    [1, 1, 1, 1]))
+    self._BatchExecuteAndCompareExact(c, cases=cases)
+
+  def testMapMulBy2(self):
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      cases.append((c.Map([c.Constant(t.vector)], t.mul_by_2, [0]),
+                    [2.0, 4.0, 6.0, 8.0]))
+    self._BatchExecuteAndCompareExactFP(c, cases=cases)
+
+  def testSimpleMapChain(self):
+    # Chains a map of constant-one with a map of mul-by-2
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      const = c.Map([c.Constant(t.vector)], t.constant_one, [0])
+      cases.append((c.Map([const], t.mul_by_2, [0]), [2.0, 2.0, 2.0, 2.0]))
+    self._BatchExecuteAndCompareExactFP(c, cases=cases)
+
+  def testDivVectorsWithMap(self):
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      cases.append((c.Map((c.Constant(t.vector), c.Constant(t.divisor_vector)),
+                          t.div, [0]), [0.2, 0.4, 0.75, 1.0]))
+    self._BatchExecuteAndCompareClose(c, cases=cases)
+
+  def testReduce1DtoScalar(self):
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      cases.append((c.Reduce(
+          operand=c.Constant(t.vector),
+          init_value=t.constant_scalar(c, 0),
+          computation_to_apply=t.add,
+          dimensions=[0]), 10))
+    self._BatchExecuteAndCompareExactFP(c, cases=cases)
+
+  def testReduce2DTo1D(self):
+    c = self._NewComputation()
+    cases = []
+    for t in self._FloatTypes():
+      input_array = c.Constant(t.matrix)
+      for dimension, expected in [(0, [5, 7, 9]), (1, [6, 15])]:
+        cases.append((c.Reduce(
+            operand=input_array,
+            init_value=t.constant_scalar(c, 0),
+            computation_to_apply=t.add,
+            dimensions=[dimension]), expected))
+    self._BatchExecuteAndCompareExactFP(c, cases=cases)
+
+  def testReduce3DAllPossibleWays(self):
+
+    def _ReduceAndTest(t, *dims):
+      # The sample is passed as an argument rather than embedded as a constant.
       c = self._NewComputation()
       c.Reduce(
-          operand=c.Constant(input_array),
-          init_value=c.ConstantF32Scalar(0),
-          computation_to_apply=self._CreateBinaryAddF32Computation(),
+          operand=c.ParameterFromNumpy(t.sample_3d_array),
+          init_value=t.constant_scalar(c, 0),
+          computation_to_apply=t.add,
           dimensions=dims)
-      self._ExecuteAndCompareClose(
-          c, expected=np.sum(input_array, axis=tuple(dims)))
+      self._ExecuteAndCompareExactFP(
+          c,
+          arguments=[t.sample_3d_array],
+          expected=np.sum(t.sample_3d_array, axis=tuple(dims)))
 
-    _ReduceAndTest(0)
-    _ReduceAndTest(0)
-    _ReduceAndTest(0, 1)
-    _ReduceAndTest(0, 2)
-    _ReduceAndTest(1, 2)
-    _ReduceAndTest(0, 1, 2)
+    for t in self._FloatTypes():
+      for dims in [(0,), (0, 1), (0, 2), (1, 2), (0, 1, 2)]:
+        _ReduceAndTest(t, *dims)
 
-  def testReduce3DAllPossibleWaysF64(self):
-    input_array = self._MakeSample3DArrayF64()
-
-    def _ReduceAndTest(*dims):
+  def testWhile(self):
+    for t in self._FloatTypes():
       c = self._NewComputation()
-      c.Reduce(
-          operand=c.Constant(input_array),
-          init_value=c.ConstantF64Scalar(0),
-          computation_to_apply=self._CreateBinaryAddF64Computation(),
-          dimensions=dims)
-      self._ExecuteAndCompareClose(
-          c, expected=np.sum(input_array, axis=tuple(dims)))
-
-    _ReduceAndTest(0)
-    _ReduceAndTest(0)
-    _ReduceAndTest(0, 1)
-    _ReduceAndTest(0, 2)
-    _ReduceAndTest(1, 2)
-    _ReduceAndTest(0, 1, 2)
-
-  def testWhileF32(self):
-    cond = self._CreateTestF32Lt10Computation()
-    body = self._CreateMulF32By2Computation()
-    c = self._NewComputation()
-    init = c.ConstantF32Scalar(1.)
-    c.While(cond, body, init)
-    self._ExecuteAndCompareClose(c, expected=16.)
-
-  def testWhileF64(self):
-    cond = self._CreateTestF64Lt10Computation()
-    body = self._CreateMulF64By2Computation()
-    c = self._NewComputation()
-    init = c.ConstantF64Scalar(1.)
-    c.While(cond, body, init)
-    self._ExecuteAndCompareClose(c, expected=16.)
+      init = t.constant_scalar(c, 1.)
+      c.While(t.lt_10, t.mul_by_2, init)
+      # 16 is exactly representable, so no tolerance is needed.
+      self._ExecuteAndCompareExactFP(c, expected=16.)
 
   def testInfeedS32Values(self):
     to_infeed = NumpyArrayS32([1, 2, 3, 4])
     c = self._NewComputation()
     c.Infeed(xla_client.Shape.from_numpy(to_infeed[0]))
     compiled_c = c.Build().CompileWithExampleArguments()
-    for item in to_infeed:
-      xla_client.transfer_to_infeed(item)
+    # Transfer zero-copy 0-d views rather than boxed numpy scalars.
+    for i in range(len(to_infeed)):
+      xla_client.transfer_to_infeed(to_infeed[i, ...])
 
+    # Each execution of the one compiled computation dequeues the next value.
     for item in to_infeed:
-      result = compiled_c.Execute()
-      self.assertEqual(result, item)
+      self._ExecuteAndCompareExact(compiled_c, expected=item)
+
+  def testInfeedS32Vector(self):
+    to_infeed = NumpyArrayS32([1, 2, 3, 4])
+    c = self._NewComputation()
+    c.Infeed(xla_client.Shape.from_numpy(to_infeed))
+    compiled_c = c.Build().CompileWithExampleArguments()
+    xla_client.transfer_to_infeed(to_infeed)
+
+    result = compiled_c.Execute()
+    np.testing.assert_array_equal(result, to_infeed)
 
 
 class ErrorTest(LocalComputationTest):
 
-  def setUp(self):
-    self.f32_scalar_2 = NumpyArrayF32(2.0)
-    self.s32_scalar_2 = NumpyArrayS32(2)
+  f32_scalar_2 = _ReadOnly(NumpyArrayF32(2.0))
+  s32_scalar_2 = _ReadOnly(NumpyArrayS32(2))
+  _ERR_RE = re.compile(r"invalid argument shape.*expected s32\[\], got f32\[\]")
 
   def testInvokeWithWrongElementType(self):
     c = self._NewComputation()
     c.ParameterFromNumpy(self.s32_scalar_2)
-    self.assertRaisesRegexp(
-        RuntimeError, r"invalid argument shape.*expected s32\[\], got f32\[\]",
-        lambda: c.Build().CompileWithExampleArguments([self.f32_scalar_2]))
+    with six.assertRaisesRegex(self, RuntimeError, self._ERR_RE):
+      c.Build().CompileWithExampleArguments([self.f32_scalar_2])
 
 
 if __name__ == "__main__":